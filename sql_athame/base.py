@@ -1,29 +1,192 @@
 import dataclasses
+import functools
 import json
 import re
 import string
-from collections.abc import Iterable, Iterator, Sequence
+import uuid
+from collections.abc import Iterable, Iterator, Mapping, Sequence
 from typing import (
     Any,
     Callable,
     Optional,
     Union,
-    cast,
     overload,
 )
 
-from typing_extensions import Literal
+from typing_extensions import Literal, TypeAlias
 
 from .escape import escape
 from .sqlalchemy import sqlalchemy_text_from_fragment
 from .types import FlatPart, Part, Placeholder, Slot
 
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+
+def json_dumps(value: Any) -> str:
+    if orjson is not None:
+        try:
+            return orjson.dumps(value).decode()
+        except TypeError:
+            # e.g. non-string dict keys or integers over 64 bits
+            pass
+    return json.dumps(value)
+
+
 newline_whitespace_re = re.compile(r"\s*\n\s*")
-auto_numbered_re = re.compile(r"[A-Za-z0-9_]")
+formatter = string.Formatter()
+# "$N" parameter references for small N, to avoid formatting a new
+# string for every placeholder reference; "$0" is never used
+parameter_refs = tuple(f"${n}" for n in range(257))
+# types for which equal values always send the same data; e.g. equal
+# Decimals may differ in scale and equal floats in sign
+dedup_value_types = frozenset((type(None), bool, int, str, bytes, uuid.UUID))
+
+
+field_name_start_chars = frozenset(string.ascii_letters + string.digits + "_")
+
+
+def auto_numbered(field_name: str) -> bool:
+    return not field_name or field_name[0] not in field_name_start_chars
+
+
+TemplateToken: TypeAlias = tuple[str, Optional[str]]
+TemplateBuilder: TypeAlias = Callable[[Sequence[Any], Mapping[str, Any]], "Fragment"]
+
+
+def parse_template(fmt: str) -> list[TemplateToken]:
+    tokens: list[TemplateToken] = []
+    next_auto_field = 0
+    for literal_text, field_name, _format_spec, _conversion in formatter.parse(fmt):
+        if field_name is not None and auto_numbered(field_name):
+            field_name = f"{next_auto_field}{field_name}"
+            next_auto_field += 1
+        tokens.append((literal_text, field_name))
+    return tokens
+
+
+def template_tokens(
+    fmt: str, preserve_formatting: bool = False
+) -> tuple[TemplateToken, ...]:
+    if not preserve_formatting and "\n" in fmt:
+        fmt = newline_whitespace_re.sub(" ", fmt)
+    return tuple(parse_template(fmt))
+
+
+def field_value(field_name: str, args: Sequence[Any], kwargs: Mapping[str, Any]) -> Any:
+    if "." in field_name or "[" in field_name:
+        return formatter.get_field(field_name, args, kwargs)[0]
+    elif field_name.isdecimal():
+        return args[int(field_name)]
+    else:
+        return kwargs[field_name]
+
+
+def field_parts(
+    field_name: str, args: Sequence[Any], kwargs: Mapping[str, Any]
+) -> Sequence[Part]:
+    try:
+        value = field_value(field_name, args, kwargs)
+    except IndexError as e:
+        raise ValueError("unfilled positional argument") from e
+    except KeyError:
+        return (Slot(field_name),)
+    # splice nested fragments in so the result stays flat; arguments
+    # may be subclasses, unlike the parts of an already built tree
+    if isinstance(value, Fragment):
+        return value.parts
+    elif isinstance(value, Slot):
+        return (value,)
+    else:
+        return (Placeholder(field_name, value),)
 
 
-def auto_numbered(field_name):
-    return not auto_numbered_re.match(field_name)
+def build_template(
+    tokens: tuple[TemplateToken, ...], args: Sequence[Any], kwargs: Mapping[str, Any]
+) -> "Fragment":
+    parts: list[Part] = []
+    fields: dict[str, Sequence[Part]] = {}
+    for literal_text, field_name in tokens:
+        if literal_text:
+            parts.append(literal_text)
+        if field_name is None:
+            continue
+        field = fields.get(field_name)
+        if field is None:
+            field = fields[field_name] = field_parts(field_name, args, kwargs)
+        parts += field
+    return Fragment(tuple(parts))
+
+
+def field_value_expr(field_name: str) -> str:
+    if "." in field_name or "[" in field_name:
+        return f"formatter.get_field({field_name!r}, args, kwargs)[0]"
+    elif field_name.isdecimal():
+        return f"args[{int(field_name)}]"
+    else:
+        return f"kwargs[{field_name!r}]"
+
+
+def compile_tokens(tokens: Iterable[TemplateToken]) -> TemplateBuilder:
+    env = dict(
+        formatter=formatter,
+        Fragment=Fragment,
+        Placeholder=Placeholder,
+        Slot=Slot,
+    )
+    func = ["def build(args, kwargs):"]
+    parts: list[str] = []
+    field_vars: dict[str, str] = {}
+    for literal_text, field_name in tokens:
+        if literal_text:
+            parts.append(repr(literal_text))
+        if field_name is None:
+            continue
+        if field_name not in field_vars:
+            var = field_vars[field_name] = f"v{len(field_vars)}"
+            func += [
+                " try:",
+                f"  {var} = {field_value_expr(field_name)}",
+                " except IndexError as e:",
+                '  raise ValueError("unfilled positional argument") from e',
+                " except KeyError:",
+                f"  {var} = (Slot({field_name!r}),)",
+                " else:",
+                # splice nested fragments in so the result stays flat
+                f"  if isinstance({var}, Fragment):",
+                f"   {var} = {var}.parts",
+                f"  elif isinstance({var}, Slot):",
+                f"   {var} = ({var},)",
+                "  else:",
+                f"   {var} = (Placeholder({field_name!r}, {var}),)",
+            ]
+        parts.append(f"*{field_vars[field_name]}")
+    func.append(f" return Fragment(({''.join(f'{p}, ' for p in parts)}))")
+    exec("\n".join(func), env)
+    return env["build"]  # type: ignore
+
+
+@functools.lru_cache(maxsize=1024)
+def template_builder(fmt: str, preserve_formatting: bool = False) -> TemplateBuilder:
+    tokens = template_tokens(fmt, preserve_formatting)
+    compiled: Optional[TemplateBuilder] = None
+    seen = False
+
+    # generating code costs far more than one interpreted build, so
+    # only do it for templates that come back
+    def build(args: Sequence[Any], kwargs: Mapping[str, Any]) -> Fragment:
+        nonlocal compiled, seen
+        if compiled is not None:
+            return compiled(args, kwargs)
+        if not seen:
+            seen = True
+            return build_template(tokens, args, kwargs)
+        compiled = compile_tokens(tokens)
+        return compiled(args, kwargs)
+
+    return build
 
 
 def process_slot_value(
@@ -34,191 +197,304 @@ def process_slot_value(
     if isinstance(value, Fragment):
         return value
     else:
-        if name not in placeholders:
-            placeholders[name] = Placeholder(name, value)
-        return placeholders[name]
+        placeholder = placeholders.get(name)
+        if placeholder is None:
+            placeholder = placeholders[name] = Placeholder(name, value)
+        return placeholder
 
 
 @dataclasses.dataclass
 class Fragment:
-    __slots__ = ["parts"]
-    parts: list[Part]
+    # `_prepared` lazily caches query()'s SQL and placeholders along with
+    # the parts they were built from; fragments are treated as immutable,
+    # but nothing stops `parts` being reassigned, so the entry is only
+    # reused while `parts` is still the same object
+    __slots__ = ["_prepared", "parts"]
+    parts: Sequence[Part]
+
+    def __init__(self, parts: Sequence[Part]) -> None:
+        # lists are still accepted; store a tuple so equality and
+        # flatten() don't depend on which was passed
+        self.parts = parts if type(parts) is tuple else tuple(parts)
 
     def flatten_into(self, parts: list[FlatPart]) -> None:
         for part in self.parts:
-            if isinstance(part, Fragment):
+            if type(part) is Fragment:
                 part.flatten_into(parts)
             else:
-                parts.append(part)
+                parts.append(part)  # type: ignore
 
     def compile(self) -> Callable[..., "Fragment"]:
         flattened = self.flatten()
-        env = dict(
-            process_slot_value=process_slot_value,
-            Fragment=Fragment,
-        )
-        func = [
-            "def compiled(**slots):",
-            " placeholders = {}",
-            " return Fragment([",
-        ]
-        for i, part in enumerate(flattened.parts):
-            if isinstance(part, Slot):
-                func.append(
-                    f"  process_slot_value({part.name!r}, slots[{part.name!r}], placeholders),"
+        captured: list[Part] = []
+        body = []
+        for part in flattened.parts:
+            if type(part) is Slot:
+                body.append(
+                    f"   process_slot_value({part.name!r}, slots[{part.name!r}], placeholders),"
                 )
             elif isinstance(part, str):
-                func.append(f"  {part!r},")
+                body.append(f"   {part!r},")
             else:
-                env[f"part_{i}"] = part
-                func.append(f"  part_{i},")
-        func += [" ])"]
+                body.append(f"   captured[{len(captured)}],")
+                captured.append(part)
+        # non-string parts are bound as closure cells of `compiled` rather
+        # than looked up in a globals dict on every call
+        func = [
+            "def make(captured, Fragment, process_slot_value):",
+            " def compiled(**slots):",
+            "  placeholders = {}",
+            "  return Fragment((",
+            *body,
+            "  ))",
+            " return compiled",
+        ]
+        env: dict[str, Any] = {}
         exec("\n".join(func), env)
-        return env["compiled"]  # type: ignore
+        return env["make"](tuple(captured), Fragment, process_slot_value)  # type: ignore
 
     def flatten(self) -> "Fragment":
-        parts: list[FlatPart] = []
-        self.flatten_into(parts)
+        parts: Sequence[Part] = self.parts
+        nested = any(type(part) is Fragment for part in parts)
+        if nested:
+            flat_parts: list[FlatPart] = []
+            self.flatten_into(flat_parts)
+            parts = flat_parts
         out_parts: list[Part] = []
+        str_run: list[str] = []
+        run_append = str_run.append
         for part in parts:
-            if isinstance(part, str) and out_parts and isinstance(out_parts[-1], str):
-                out_parts[-1] += part
+            if type(part) is str:
+                run_append(part)
             else:
+                if str_run:
+                    out_parts.append("".join(str_run))
+                    str_run.clear()
                 out_parts.append(part)
-        return Fragment(out_parts)
+        if str_run:
+            out_parts.append("".join(str_run))
+        if not nested and len(out_parts) == len(parts):
+            # already flat with no adjacent strings; fragments are immutable
+            return self
+        return Fragment(tuple(out_parts))
 
     def fill(self, **kwargs: Any) -> "Fragment":
         parts: list[Part] = []
-        self.flatten_into(cast(list[FlatPart], parts))
-        placeholders: dict[str, Placeholder] = {}
-        for i, part in enumerate(parts):
-            if isinstance(part, Slot):
-                parts[i] = process_slot_value(
-                    part.name, kwargs[part.name], placeholders
+        self._fill_into(parts, kwargs, {})
+        return Fragment(tuple(parts))
+
+    def _fill_into(
+        self,
+        parts: list[Part],
+        slots: dict[str, Any],
+        placeholders: dict[str, Placeholder],
+    ) -> None:
+        for part in self.parts:
+            if type(part) is Fragment:
+                part._fill_into(parts, slots, placeholders)
+            elif type(part) is Slot:
+                parts.append(
+                    process_slot_value(part.name, slots[part.name], placeholders)
                 )
-        return Fragment(parts)
+            else:
+                parts.append(part)
 
     @overload
     def prep_query(
-        self, allow_slots: Literal[True]
+        self, allow_slots: Literal[True], dedup_values: bool = False
     ) -> tuple[str, list[Union[Placeholder, Slot]]]: ...  # pragma: no cover
 
     @overload
     def prep_query(
-        self, allow_slots: Literal[False] = False
+        self, allow_slots: Literal[False] = False, dedup_values: bool = False
     ) -> tuple[str, list[Placeholder]]: ...  # pragma: no cover
 
-    def prep_query(self, allow_slots: bool = False) -> tuple[str, list[Any]]:
-        parts: list[FlatPart] = []
-        self.flatten_into(parts)
-        args: list[Union[Placeholder, Slot]] = []
-        placeholder_ids: dict[Placeholder, int] = {}
-        slot_ids: dict[Slot, int] = {}
+    def prep_query(
+        self, allow_slots: bool = False, dedup_values: bool = False
+    ) -> tuple[str, list[Any]]:
         out_parts: list[str] = []
-        for part in parts:
-            if isinstance(part, Slot):
+        args: list[Union[Placeholder, Slot]] = []
+        value_ids: Optional[dict[Any, int]] = {} if dedup_values else None
+        self._prep_into(out_parts, args, {}, {}, value_ids, allow_slots)
+        return join_stripped(out_parts), args
+
+    def _prep_into(
+        self,
+        out_parts: list[str],
+        args: list[Union[Placeholder, Slot]],
+        placeholder_ids: dict[int, int],
+        slot_ids: dict[str, int],
+        value_ids: Optional[dict[Any, int]],
+        allow_slots: bool,
+    ) -> None:
+        # placeholders are keyed by identity; the fragment tree keeps them alive
+        for part in self.parts:
+            if type(part) is str:
+                out_parts.append(part)
+            elif type(part) is Fragment:
+                part._prep_into(
+                    out_parts, args, placeholder_ids, slot_ids, value_ids, allow_slots
+                )
+            elif type(part) is Placeholder:
+                n = placeholder_ids.get(id(part))
+                if n is None:
+                    if value_ids is None:
+                        args.append(part)
+                        n = len(args)
+                    else:
+                        # only values whose equality implies identical
+                        # parameter data are merged; the type is part of
+                        # the key so 1 and True stay distinct.  Anything
+                        # else is keyed by its (bare int) id, which the
+                        # placeholders in the tree keep alive
+                        key: Any
+                        if type(part.value) in dedup_value_types:
+                            key = (type(part.value), part.value)
+                        else:
+                            key = id(part.value)
+                        n = value_ids.get(key)
+                        if n is None:
+                            args.append(part)
+                            n = value_ids[key] = len(args)
+                    placeholder_ids[id(part)] = n
+                out_parts.append(
+                    parameter_refs[n] if n < len(parameter_refs) else f"${n}"
+                )
+            elif type(part) is Slot:
                 if not allow_slots:
                     raise ValueError(f"Unfilled slot: {part.name!r}")
-                if part not in slot_ids:
+                n = slot_ids.get(part.name)
+                if n is None:
                     args.append(part)
-                    slot_ids[part] = len(args)
-                out_parts.append(f"${slot_ids[part]}")
-            elif isinstance(part, Placeholder):
-                if part not in placeholder_ids:
-                    args.append(part)
-                    placeholder_ids[part] = len(args)
-                out_parts.append(f"${placeholder_ids[part]}")
+                    n = slot_ids[part.name] = len(args)
+                out_parts.append(
+                    parameter_refs[n] if n < len(parameter_refs) else f"${n}"
+                )
             else:
-                assert isinstance(part, str)
-                out_parts.append(part)
-        return "".join(out_parts).strip(), args
+                out_parts.append(part)  # type: ignore
+
+    def _prepared_query(self) -> tuple[str, list[Placeholder]]:
+        try:
+            parts, query, placeholders = self._prepared  # type: ignore
+            if parts is self.parts:
+                return query, placeholders
+        except AttributeError:
+            pass
+        query, placeholders = self.prep_query()
+        self._prepared = (self.parts, query, placeholders)
+        return query, placeholders
 
     def query(self) -> tuple[str, list[Any]]:
-        query, args = self.prep_query()
-        placeholder_values = [arg.value for arg in args]
-        return query, placeholder_values
+        query, placeholders = self._prepared_query()
+        return query, [placeholder.value for placeholder in placeholders]
+
+    def sql(self) -> str:
+        return self._prepared_query()[0]
 
     def sqlalchemy_text(self) -> Any:
         return sqlalchemy_text_from_fragment(self)
 
     def prepare(self) -> tuple[str, Callable[..., list[Any]]]:
         query, args = self.prep_query(allow_slots=True)
-        env = {}
-        func = [
-            "def generate_args(**kwargs):",
-            " return [",
-        ]
-        for i, arg in enumerate(args):
+        values: list[Any] = []
+        body = []
+        for arg in args:
             if isinstance(arg, Slot):
-                func.append(f"  kwargs[{arg.name!r}],")
+                body.append(f"   kwargs[{arg.name!r}],")
             else:
-                env[f"value_{i}"] = arg.value
-                func.append(f"  value_{i},")
-        func += [" ]"]
+                body.append(f"   values[{len(values)}],")
+                values.append(arg.value)
+        func = [
+            "def make(values):",
+            " def generate_args(**kwargs):",
+            "  return [",
+            *body,
+            "  ]",
+            " return generate_args",
+        ]
+        env: dict[str, Any] = {}
         exec("\n".join(func), env)
-        return query, env["generate_args"]  # type: ignore
+        return query, env["make"](tuple(values))  # type: ignore
+
+    def compile_query(self) -> Callable[..., tuple[str, list[Any]]]:
+        query, generate_args = self.prepare()
+
+        def compiled(**slots: Any) -> tuple[str, list[Any]]:
+            return query, generate_args(**slots)
+
+        return compiled
 
     def __iter__(self) -> Iterator[Any]:
         sql, args = self.query()
         return iter((sql, *args))
 
     def join(self, parts: Iterable["Fragment"]) -> "Fragment":
-        return Fragment(list(join_parts(parts, infix=self)))
+        if not isinstance(parts, (list, tuple)):
+            parts = list(parts)
+        if not parts:
+            return empty_fragment
+        if len(parts) == 1:
+            return parts[0]
+        parts = plain_fragments(parts)
+        # splice a single-part separator (the usual `sql(", ")`) directly
+        # rather than nesting it, so walks don't recurse per separator
+        infix: Part
+        if len(self.parts) == 1:
+            infix = self.parts[0]
+        else:
+            infix = plain_fragments((self,))[0]
+        if len(parts) == 2:
+            return Fragment((parts[0], infix, parts[1]))
+        return Fragment(tuple(join_parts(parts, infix=infix)))
 
 
 class SQLFormatter:
     def __call__(
         self, fmt: str, *args: Any, preserve_formatting: bool = False, **kwargs: Any
     ) -> Fragment:
-        if not preserve_formatting:
-            fmt = newline_whitespace_re.sub(" ", fmt)
-        fmtr = string.Formatter()
-        parts: list[Part] = []
-        placeholders: dict[str, Placeholder] = {}
-        next_auto_field = 0
-        for literal_text, field_name, _format_spec, _conversion in fmtr.parse(fmt):
-            parts.append(literal_text)
-            if field_name is not None:
-                if auto_numbered(field_name):
-                    field_name = f"{next_auto_field}{field_name}"
-                    next_auto_field += 1
-                try:
-                    value = fmtr.get_field(field_name, args, kwargs)[0]
-                except IndexError as e:
-                    raise ValueError("unfilled positional argument") from e
-                except KeyError:
-                    value = Slot(field_name)
-                if isinstance(value, Fragment) or isinstance(value, Slot):
-                    parts.append(value)
-                else:
-                    if field_name not in placeholders:
-                        placeholders[field_name] = Placeholder(field_name, value)
-                    parts.append(placeholders[field_name])
-        return Fragment(parts)
+        if "{" not in fmt and "}" not in fmt:
+            if not preserve_formatting and "\n" in fmt:
+                fmt = newline_whitespace_re.sub(" ", fmt)
+            return lit(fmt)
+        return template_builder(fmt, preserve_formatting)(args, kwargs)
+
+    def compile_template(
+        self, fmt: str, *, preserve_formatting: bool = False
+    ) -> Callable[..., Fragment]:
+        build = compile_tokens(template_tokens(fmt, preserve_formatting))
+
+        def compiled(*args: Any, **kwargs: Any) -> Fragment:
+            return build(args, kwargs)
+
+        return compiled
 
     @staticmethod
     def value(value: Any) -> Fragment:
         placeholder = Placeholder("value", value)
-        return Fragment([placeholder])
+        return Fragment((placeholder,))
 
     @staticmethod
     def escape(value: Any) -> Fragment:
         return lit(escape(value))
 
+    # fragments are immutable, so slots and identifiers for the same
+    # name can share one instance; arbitrary literal text is not cached
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def slot(name: str) -> Fragment:
-        return Fragment([Slot(name)])
+        return Fragment((Slot(name),))
 
     @staticmethod
     def literal(text: str) -> Fragment:
-        return Fragment([text])
+        return lit(text)
 
     @staticmethod
+    @functools.lru_cache(maxsize=1024)
     def identifier(name: str, prefix: Optional[str] = None) -> Fragment:
         if prefix:
-            return lit(f"{quote_identifier(prefix)}.{quote_identifier(name)}")
+            return lit(quote_identifier(prefix) + "." + quote_identifier(name))
         else:
-            return lit(f"{quote_identifier(name)}")
+            return lit(quote_identifier(name))
 
     @overload
     def all(self, parts: Iterable[Fragment]) -> Fragment: ...  # pragma: no cover
@@ -227,9 +503,7 @@ class SQLFormatter:
     def all(self, *parts: Fragment) -> Fragment: ...  # pragma: no cover
 
     def all(self, *parts) -> Fragment:  # type: ignore
-        if parts and not isinstance(parts[0], Fragment):
-            parts = parts[0]
-        return any_all(list(parts), "AND", "TRUE")
+        return any_all(collect_fragments(parts), and_infix, true_fragment)
 
     @overload
     def any(self, parts: Iterable[Fragment]) -> Fragment: ...  # pragma: no cover
@@ -238,9 +512,7 @@ class SQLFormatter:
     def any(self, *parts: Fragment) -> Fragment: ...  # pragma: no cover
 
     def any(self, *parts) -> Fragment:  # type: ignore
-        if parts and not isinstance(parts[0], Fragment):
-            parts = parts[0]
-        return any_all(list(parts), "OR", "FALSE")
+        return any_all(collect_fragments(parts), or_infix, false_fragment)
 
     @overload
     def list(self, parts: Iterable[Fragment]) -> Fragment: ...  # pragma: no cover
@@ -249,15 +521,21 @@ class SQLFormatter:
     def list(self, *parts: Fragment) -> Fragment: ...  # pragma: no cover
 
     def list(self, *parts) -> Fragment:  # type: ignore
-        if parts and not isinstance(parts[0], Fragment):
-            parts = parts[0]
-        return Fragment(list(join_parts(parts, infix=", ")))
+        frags = collect_fragments(parts)
+        if not frags:
+            return empty_fragment
+        return Fragment(tuple(join_parts(frags, infix=", ")))
 
     def unnest(self, data: Iterable[Sequence[Any]], types: Iterable[str]) -> Fragment:
-        nested = [nest_for_type(x, t) for x, t in zip(zip(*data), types)]
-        if not nested:
-            nested = [nest_for_type([], t) for t in types]
-        return Fragment(["UNNEST(", self.list(nested), ")"])
+        types = list(types)
+        columns: list[Sequence[Any]] = list(zip(*data)) or [[] for _ in types]
+        return self.unnest_columns(columns, types)
+
+    def unnest_columns(
+        self, columns: Iterable[Sequence[Any]], types: Iterable[str]
+    ) -> Fragment:
+        nested = [nest_for_type(x, t) for x, t in zip(columns, types)]
+        return Fragment(("UNNEST(", self.list(nested), ")"))
 
 
 sql = SQLFormatter()
@@ -276,43 +554,88 @@ def nest_for_type(data: Sequence[Any], typename: str) -> Fragment:
 
         # KLUDGE - this doesn't work for trying to store literal
         # strings when autoconverting; None is treated as SQL NULL
+        dumps = json_dumps
         processed_data = [
-            x if x is None or isinstance(x, str) else json.dumps(x) for x in data
+            x if x is None or isinstance(x, str) else dumps(x) for x in data
         ]
         return Fragment(
-            [Placeholder("data", processed_data), f"::TEXT[]::{typename}[]"]
+            (Placeholder("data", processed_data), f"::TEXT[]::{typename}[]")
         )
     else:
-        return Fragment([Placeholder("data", data), f"::{typename}[]"])
+        return Fragment((Placeholder("data", data), f"::{typename}[]"))
 
 
 def lit(text: str) -> Fragment:
-    return Fragment([text])
+    if not text:
+        return empty_fragment
+    return Fragment((text,))
+
+
+# fragments are immutable, so these can be shared between callers
+empty_fragment = Fragment(())
+true_fragment = lit("TRUE")
+false_fragment = lit("FALSE")
+and_infix = ") AND ("
+or_infix = ") OR ("
+
+
+def collect_fragments(parts: Sequence[Any]) -> Sequence[Fragment]:
+    # `parts` is either varargs of Fragments or a 1-tuple holding an iterable
+    if len(parts) == 1 and not isinstance(parts[0], Fragment):
+        parts = parts[0]
+        if type(parts) is not list and type(parts) is not tuple:
+            parts = list(parts)
+    return plain_fragments(parts)
+
+
+def plain_fragments(frags: Sequence[Fragment]) -> Sequence[Fragment]:
+    # the tree walkers check exact types, so Fragment subclasses are
+    # rewrapped as plain fragments before being nested
+    for frag in frags:
+        if type(frag) is not Fragment:
+            return [f if type(f) is Fragment else Fragment(f.parts) for f in frags]
+    return frags
 
 
-def any_all(frags: list[Fragment], op: str, base_case: str) -> Fragment:
+def any_all(frags: Sequence[Fragment], infix: str, base_case: Fragment) -> Fragment:
     if not frags:
-        return lit(base_case)
-    parts = join_parts(frags, prefix="(", infix=f") {op} (", suffix=")")
-    return Fragment(list(parts))
+        return base_case
+    return Fragment(tuple(join_parts(frags, prefix="(", infix=infix, suffix=")")))
 
 
 def join_parts(
-    parts: Iterable[Part],
+    parts: Sequence[Part],
     infix: Part,
     prefix: Optional[Part] = None,
     suffix: Optional[Part] = None,
-) -> Iterator[Part]:
+) -> list[Part]:
+    start = 1 if prefix else 0
+    joined_len = 2 * len(parts) - 1 if parts else 0
+    out = [infix] * (start + joined_len + (1 if suffix else 0))
     if prefix:
-        yield prefix
-    for i, part in enumerate(parts):
-        if i:
-            yield infix
-        yield part
+        out[0] = prefix
+    out[start : start + joined_len : 2] = parts
     if suffix:
-        yield suffix
+        out[-1] = suffix
+    return out
+
+
+def join_stripped(parts: list[str]) -> str:
+    # strip the end parts in place; stripping the joined string would copy
+    # all of it whenever there is surrounding whitespace
+    start, end = 0, len(parts)
+    while start < end:
+        parts[start] = parts[start].lstrip()
+        if parts[start]:
+            break
+        start += 1
+    while end > start:
+        parts[end - 1] = parts[end - 1].rstrip()
+        if parts[end - 1]:
+            break
+        end -= 1
+    return "".join(parts)
 
 
 def quote_identifier(name: str) -> str:
-    quoted = name.replace('"', '""')
-    return f'"{quoted}"'
+    return '"' + name.replace('"', '""') + '"'
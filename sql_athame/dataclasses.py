@@ -1,5 +1,6 @@
 import datetime
 import functools
+import itertools
 import sys
 import uuid
 from collections.abc import AsyncGenerator, Iterable, Mapping
@@ -44,9 +45,13 @@ class ColumnInfo:
     deserialize: Optional[Callable[[Any], Any]] = None
 
     def __post_init__(self, constraints: Union[str, Iterable[str], None]) -> None:
-        if constraints is not None:
-            if type(constraints) is str:
-                constraints = (constraints,)
+        if constraints is None:
+            return
+        if isinstance(constraints, str):
+            self._constraints = (constraints,)
+        elif isinstance(constraints, tuple):
+            self._constraints = constraints
+        else:
             self._constraints = tuple(constraints)
 
     @staticmethod
@@ -76,7 +81,23 @@ class ConcreteColumnInfo:
     def from_column_info(
         field: Field, type_hint: Any, *args: ColumnInfo
     ) -> "ConcreteColumnInfo":
-        info = functools.reduce(ColumnInfo.merge, args, ColumnInfo())
+        # same as reducing with ColumnInfo.merge, without an intermediate
+        # ColumnInfo per step
+        info = ColumnInfo()
+        constraints: list[str] = []
+        for arg in args:
+            if arg.type is not None:
+                info.type = arg.type
+            if arg.create_type is not None:
+                info.create_type = arg.create_type
+            if arg.nullable is not None:
+                info.nullable = arg.nullable
+            constraints += arg._constraints
+            if arg.serialize is not None:
+                info.serialize = arg.serialize
+            if arg.deserialize is not None:
+                info.deserialize = arg.deserialize
+        info._constraints = tuple(constraints)
         if info.create_type is None and info.type is not None:
             info.create_type = info.type
             info.type = sql_create_type_map.get(info.type.upper(), info.type)
@@ -116,6 +137,8 @@ if sys.version_info >= (3, 10):
 NULLABLE_TYPES = (type(None), Any, object)
 
 
+# common hints like Optional[int] recur across models
+@functools.lru_cache(maxsize=256)
 def split_nullable(typ: type) -> tuple[bool, type]:
     nullable = typ in NULLABLE_TYPES
     if get_origin(typ) in UNION_TYPES:
@@ -148,12 +171,16 @@ sql_type_map: dict[type, str] = {
 }
 
 
+cache_miss = object()
+
+
 T = TypeVar("T", bound="ModelBase")
 U = TypeVar("U")
 
 
 class ModelBase:
     _column_info: dict[str, ConcreteColumnInfo]
+    _field_names: tuple[str, ...]
     _cache: dict[tuple, Any]
     table_name: str
     primary_key_names: tuple[str, ...]
@@ -179,14 +206,29 @@ class ModelBase:
             cls.primary_key_names = (primary_key,)
         else:
             cls.primary_key_names = tuple(primary_key)
+        # swap in a specialized getter unless the hierarchy overrides it
+        getter = cls.primary_key
+        if getter is ModelBase.primary_key or getattr(getter, "generated", False):
+            cls.primary_key = primary_key_getter(cls.primary_key_names)  # type: ignore
+        # from_mapping replaces itself with a specialized function on first
+        # use; give each model its own lazy version so it never inherits a
+        # parent model's (which would construct the parent class)
+        lazy_from_mapping = ModelBase.__dict__["from_mapping"]
+        inherited = next(
+            klass.__dict__["from_mapping"]
+            for klass in cls.__mro__
+            if "from_mapping" in klass.__dict__
+        )
+        if inherited is lazy_from_mapping or getattr(inherited, "generated", False):
+            cls.from_mapping = lazy_from_mapping  # type: ignore
 
     @classmethod
     def _cached(cls, key: tuple, thunk: Callable[[], U]) -> U:
-        try:
-            return cls._cache[key]
-        except KeyError:
-            cls._cache[key] = thunk()
-            return cls._cache[key]
+        cache = cls._cache
+        value = cache.get(key, cache_miss)
+        if value is cache_miss:
+            value = cache[key] = thunk()
+        return value
 
     @classmethod
     def column_info_for_field(cls, field: Field, type_hint: type) -> ConcreteColumnInfo:
@@ -206,13 +248,18 @@ class ModelBase:
     @classmethod
     def column_info(cls) -> dict[str, ConcreteColumnInfo]:
         try:
-            return cls._column_info
-        except AttributeError:
+            # looked up on the class itself: a subclass model must not pick up
+            # its parent's cached column info
+            return cls.__dict__["_column_info"]
+        except KeyError:
             type_hints = get_type_hints(cls, include_extras=True)
+            # computed on first use rather than in __init_subclass__, which
+            # runs before @dataclass has added the fields
             cls._column_info = {
                 f.name: cls.column_info_for_field(f, type_hints[f.name])
                 for f in fields(cls)  # type: ignore
             }
+            cls._field_names = tuple(cls._column_info)
             return cls._column_info
 
     @classmethod
@@ -225,11 +272,11 @@ class ModelBase:
 
     @classmethod
     def field_names(cls, *, exclude: FieldNamesSet = ()) -> list[str]:
-        return [
-            ci.field.name
-            for ci in cls.column_info().values()
-            if ci.field.name not in exclude
-        ]
+        cls.column_info()
+        if not exclude:
+            return list(cls._field_names)
+        excluded = frozenset(exclude)
+        return [name for name in cls._field_names if name not in excluded]
 
     @classmethod
     def field_names_sql(
@@ -243,39 +290,55 @@ class ModelBase:
         return tuple(getattr(self, pk) for pk in self.primary_key_names)
 
     @classmethod
-    def _get_field_values_fn(
-        cls: type[T], exclude: FieldNamesSet = ()
+    def _make_field_values_fn(
+        cls: type[T], exclude: FieldNamesSet, item: str, env: dict[str, Any]
     ) -> Callable[[T], list[Any]]:
-        env: dict[str, Any] = {}
-        func = ["def get_field_values(self): return ["]
+        # item is a format string wrapping each (serialized) field value
+        func = ["def field_values(self): return ["]
         for ci in cls.column_info().values():
             if ci.field.name not in exclude:
                 if ci.serialize:
                     env[f"_ser_{ci.field.name}"] = ci.serialize
-                    func.append(f"_ser_{ci.field.name}(self.{ci.field.name}),")
+                    expr = f"_ser_{ci.field.name}(self.{ci.field.name})"
                 else:
-                    func.append(f"self.{ci.field.name},")
+                    expr = f"self.{ci.field.name}"
+                func.append(item.format(expr) + ",")
         func += ["]"]
         exec(" ".join(func), env)
-        return env["get_field_values"]
+        return env["field_values"]
+
+    @classmethod
+    def _get_field_values_fn(
+        cls: type[T], exclude: FieldNamesSet = ()
+    ) -> Callable[[T], list[Any]]:
+        return cls._make_field_values_fn(exclude, "{}", {})
 
     def field_values(self, *, exclude: FieldNamesSet = ()) -> list[Any]:
         get_field_values = self._cached(
-            ("get_field_values", tuple(sorted(exclude))),
+            ("get_field_values", exclude_key(exclude)),
             lambda: self._get_field_values_fn(exclude),
         )
         return get_field_values(self)
 
+    @classmethod
+    def _get_field_values_sql_fn(
+        cls: type[T], exclude: FieldNamesSet = (), default_none: bool = False
+    ) -> Callable[[T], list[Fragment]]:
+        env: dict[str, Any] = {"value": sql.value, "default": sql.literal("DEFAULT")}
+        if default_none:
+            item = "default if (v := {}) is None else value(v)"
+        else:
+            item = "value({})"
+        return cls._make_field_values_fn(exclude, item, env)
+
     def field_values_sql(
         self, *, exclude: FieldNamesSet = (), default_none: bool = False
     ) -> list[Fragment]:
-        if default_none:
-            return [
-                sql.literal("DEFAULT") if value is None else sql.value(value)
-                for value in self.field_values()
-            ]
-        else:
-            return [sql.value(value) for value in self.field_values()]
+        get_field_values_sql = self._cached(
+            ("get_field_values_sql", exclude_key(exclude), default_none),
+            lambda: self._get_field_values_sql_fn(exclude, default_none),
+        )
+        return get_field_values_sql(self)
 
     @classmethod
     def _get_from_mapping_fn(cls: type[T]) -> Callable[[Mapping[str, Any]], T]:
@@ -300,6 +363,7 @@ class ModelBase:
     def from_mapping(cls: type[T], mapping: Mapping[str, Any], /) -> T:
         # KLUDGE nasty but... efficient?
         from_mapping_fn = cls._get_from_mapping_fn()
+        from_mapping_fn.generated = True  # type: ignore
         cls.from_mapping = from_mapping_fn  # type: ignore
         return from_mapping_fn(mapping)
 
@@ -353,7 +417,7 @@ class ModelBase:
         )
         query = cached(where=where)
         if for_update:
-            query = Fragment([query, " FOR UPDATE"])
+            query = Fragment((query, " FOR UPDATE"))
         return query
 
     @classmethod
@@ -408,7 +472,7 @@ class ModelBase:
 
     def insert_sql(self, exclude: FieldNamesSet = ()) -> Fragment:
         cached = self._cached(
-            ("insert_sql", tuple(sorted(exclude))),
+            ("insert_sql", exclude_key(exclude)),
             lambda: sql(
                 "INSERT INTO {table} ({fields}) VALUES ({values})",
                 table=self.table_name_sql(),
@@ -427,7 +491,7 @@ class ModelBase:
     @classmethod
     def upsert_sql(cls, insert_sql: Fragment, exclude: FieldNamesSet = ()) -> Fragment:
         cached = cls._cached(
-            ("upsert_sql", tuple(sorted(exclude))),
+            ("upsert_sql", exclude_key(exclude)),
             lambda: sql(
                 " ON CONFLICT ({pks}) DO UPDATE SET {assignments}",
                 insert_sql=insert_sql,
@@ -440,7 +504,7 @@ class ModelBase:
                 ),
             ).flatten(),
         )
-        return Fragment([insert_sql, cached])
+        return Fragment((insert_sql, cached))
 
     async def upsert(
         self, connection_or_pool: Union[Connection, Pool], exclude: FieldNamesSet = ()
@@ -454,20 +518,19 @@ class ModelBase:
 
     @classmethod
     def delete_multiple_sql(cls: type[T], rows: Iterable[T]) -> Fragment:
-        cached = cls._cached(
+        cached, types = cls._cached(
             ("delete_multiple_sql",),
-            lambda: sql(
-                "DELETE FROM {table} WHERE ({pks}) IN (SELECT * FROM {unnest})",
-                table=cls.table_name_sql(),
-                pks=sql.list(sql.identifier(pk) for pk in cls.primary_key_names),
-            ).compile(),
+            lambda: (
+                sql(
+                    "DELETE FROM {table} WHERE ({pks}) IN (SELECT * FROM {unnest})",
+                    table=cls.table_name_sql(),
+                    pks=sql.list(sql.identifier(pk) for pk in cls.primary_key_names),
+                ).compile(),
+                tuple(cls.column_info()[pk].type for pk in cls.primary_key_names),
+            ),
         )
-        column_info = cls.column_info()
         return cached(
-            unnest=sql.unnest(
-                (row.primary_key() for row in rows),
-                (column_info[pk].type for pk in cls.primary_key_names),
-            ),
+            unnest=sql.unnest((row.primary_key() for row in rows), types),
         )
 
     @classmethod
@@ -478,20 +541,19 @@ class ModelBase:
 
     @classmethod
     def insert_multiple_sql(cls: type[T], rows: Iterable[T]) -> Fragment:
-        cached = cls._cached(
+        cached, types = cls._cached(
             ("insert_multiple_sql",),
-            lambda: sql(
-                "INSERT INTO {table} ({fields}) SELECT * FROM {unnest}",
-                table=cls.table_name_sql(),
-                fields=sql.list(cls.field_names_sql()),
-            ).compile(),
+            lambda: (
+                sql(
+                    "INSERT INTO {table} ({fields}) SELECT * FROM {unnest}",
+                    table=cls.table_name_sql(),
+                    fields=sql.list(cls.field_names_sql()),
+                ).compile(),
+                tuple(ci.type for ci in cls.column_info().values()),
+            ),
         )
-        column_info = cls.column_info()
         return cached(
-            unnest=sql.unnest(
-                (row.field_values() for row in rows),
-                (column_info[name].type for name in cls.field_names()),
-            ),
+            unnest=sql.unnest((row.field_values() for row in rows), types),
         )
 
     @classmethod
@@ -598,10 +660,10 @@ class ModelBase:
         ignore: FieldNamesSet = (),
         insert_only: FieldNamesSet = (),
     ) -> "ReplaceMultiplePlan[T]":
-        ignore = sorted(set(ignore) | set(insert_only))
+        ignored = ignore_key(ignore, insert_only)
         equal_ignoring = cls._cached(
-            ("equal_ignoring", tuple(ignore)),
-            lambda: cls._get_equal_ignoring_fn(ignore),
+            ("equal_ignoring", ignored),
+            lambda: cls._get_equal_ignoring_fn(ignored),
         )
         pending = {row.primary_key(): row for row in map(cls.ensure_model, rows)}
 
@@ -667,10 +729,10 @@ class ModelBase:
         ignore: FieldNamesSet = (),
         insert_only: FieldNamesSet = (),
     ) -> tuple[list[T], list[tuple[T, T, list[str]]], list[T]]:
-        ignore = sorted(set(ignore) | set(insert_only))
+        ignored = ignore_key(ignore, insert_only)
         differences_ignoring = cls._cached(
-            ("differences_ignoring", tuple(ignore)),
-            lambda: cls._get_differences_ignoring_fn(ignore),
+            ("differences_ignoring", ignored),
+            lambda: cls._get_differences_ignoring_fn(ignored),
         )
 
         pending = {row.primary_key(): row for row in map(cls.ensure_model, rows)}
@@ -731,8 +793,42 @@ class ReplaceMultiplePlan(Generic[T]):
         await self.execute_deletes(connection)
 
 
+@functools.cache
+def primary_key_getter(names: tuple[str, ...]) -> Callable[[Any], tuple]:
+    env: dict[str, Any] = {}
+    exec(
+        f"def primary_key(self): return ({''.join(f'self.{n}, ' for n in names)})", env
+    )
+    getter = env["primary_key"]
+    getter.generated = True
+    return getter
+
+
+def exclude_key(exclude: FieldNamesSet) -> tuple[str, ...]:
+    # the default `()` is by far the most common case; skip sorting it
+    if not exclude:
+        return ()
+    return tuple(sorted(exclude))
+
+
+def ignore_key(ignore: FieldNamesSet, insert_only: FieldNamesSet) -> tuple[str, ...]:
+    # usually at most one of these is given; skip building the union then
+    if not insert_only:
+        return exclude_key(ignore)
+    if not ignore:
+        return exclude_key(insert_only)
+    return tuple(sorted(set(ignore) | set(insert_only)))
+
+
 def chunked(lst, n):
-    if type(lst) is not list:
-        lst = list(lst)
-    for i in range(0, len(lst), n):
-        yield lst[i : i + n]
+    if isinstance(lst, list):
+        for i in range(0, len(lst), n):
+            yield lst[i : i + n]
+        return
+    # stream other iterables rather than materializing them up front
+    it = iter(lst)
+    while True:
+        chunk = list(itertools.islice(it, n))
+        if not chunk:
+            return
+        yield chunk
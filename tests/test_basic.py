@@ -1,8 +1,15 @@
+import datetime
+import json
+import re
 import uuid
+from decimal import Decimal
+from typing import Any
 
 import pytest
 
+import sql_athame.base
 from sql_athame import sql
+from sql_athame.base import Fragment
 
 
 def get_orders(query):
@@ -64,6 +71,33 @@ def test_iter():
     ]
 
 
+def test_query_repeated():
+    query = get_orders({"id": "xyzzy", "from": "2019-05-01"})
+    expected = (
+        "SELECT * FROM orders WHERE TRUE AND id = $1 AND start_time >= $2",
+        ["xyzzy", "2019-05-01"],
+    )
+    assert query.query() == expected
+    assert query.query() == expected
+    assert sql("SELECT {}, ({})", 42, query).query() == (
+        "SELECT $1, (SELECT * FROM orders WHERE TRUE AND id = $2 AND start_time >= $3)",
+        [42, "xyzzy", "2019-05-01"],
+    )
+
+
+def test_sql():
+    query = sql("SELECT * FROM foo WHERE id = {}", 1)
+    assert query.sql() == "SELECT * FROM foo WHERE id = $1"
+    assert query.sql() == query.query()[0]
+    with pytest.raises(ValueError, match="Unfilled slot"):
+        sql("SELECT * FROM foo WHERE id = {id}").sql()
+
+    # the cached query follows reassigned parts
+    query.parts = ("SELECT 2",)
+    assert query.sql() == "SELECT 2"
+    assert query.query() == ("SELECT 2", [])
+
+
 def test_all_any_list():
     assert list(sql.all([sql("a"), sql("b"), sql("c")])) == ["(a) AND (b) AND (c)"]
     assert list(sql.any([sql("a"), sql("b"), sql("c")])) == ["(a) OR (b) OR (c)"]
@@ -83,6 +117,58 @@ def test_repeated_value_keyword():
     )
 
 
+def test_query_strip():
+    assert sql(" ").query() == ("", [])
+    assert sql("  {}  ", sql(" ")).query() == ("", [])
+    assert sql(" {} {} ", sql(" "), 1).query() == ("$1", [1])
+    assert sql("{} {}\n", 1, sql("  ")).query() == ("$1", [1])
+
+
+def test_prep_query_dedup_values():
+    shared = [2]
+    query = sql(
+        "SELECT {}, {}, {}, {}, {}, {}, {}, {}",
+        "a",
+        "a",
+        1,
+        1.0,
+        [1],
+        [1],
+        sql.value(shared),
+        sql.value(shared),
+    ).prep_query(dedup_values=True)
+    assert query[0] == "SELECT $1, $1, $2, $3, $4, $5, $6, $6"
+    assert [p.value for p in query[1]] == ["a", 1, 1.0, [1], [1], [2]]
+
+    u = uuid.uuid4()
+    query = sql(
+        "SELECT {}, {}, {}, {}, {}, {}, {}, {}",
+        1,
+        True,
+        1,
+        None,
+        None,
+        b"x",
+        u,
+        uuid.UUID(str(u)),
+    ).prep_query(dedup_values=True)
+    assert query[0] == "SELECT $1, $2, $1, $3, $3, $4, $5, $5"
+
+    # equal values that would send different data stay distinct
+    utc = datetime.datetime(2020, 1, 1, tzinfo=datetime.timezone.utc)
+    est = utc.astimezone(datetime.timezone(datetime.timedelta(hours=-5)))
+    query = sql(
+        "SELECT {}, {}, {}, {}, {}, {}",
+        Decimal("1.0"),
+        Decimal("1.00"),
+        0.0,
+        -0.0,
+        utc,
+        est,
+    ).prep_query(dedup_values=True)
+    assert query[0] == "SELECT $1, $2, $3, $4, $5, $6"
+
+
 def test_repeated_value_nested():
     sq_a = get_orders({"id": "a"})
     sq_b = get_orders({"id": "b"})
@@ -166,11 +252,79 @@ def test_unnest():
     assert list(query) == ["UNNEST($1::INTEGER[], $2::TEXT[])", (1, 2), ("foo", "bar")]
 
 
+class FakeOrjson:
+    @staticmethod
+    def dumps(value):
+        if not all(isinstance(k, str) for k in value):
+            raise TypeError("Dict key must be str")
+        return json.dumps(value, separators=(",", ":")).encode()
+
+
+def test_unnest_json(monkeypatch):
+    data: list[list[Any]] = [[{"a": 1}], [{1: 2}], [None], ['{"b": 2}']]
+
+    monkeypatch.setattr(sql_athame.base, "orjson", None)
+    query = sql.unnest(data, ("JSONB",))
+    assert list(query) == [
+        "UNNEST($1::TEXT[]::JSONB[])",
+        ['{"a": 1}', '{"1": 2}', None, '{"b": 2}'],
+    ]
+
+    monkeypatch.setattr(sql_athame.base, "orjson", FakeOrjson)
+    query = sql.unnest(data, ("JSONB",))
+    # orjson rejects non-string keys, so that value falls back to json
+    assert list(query) == [
+        "UNNEST($1::TEXT[]::JSONB[])",
+        ['{"a":1}', '{"1": 2}', None, '{"b": 2}'],
+    ]
+
+
+def test_unnest_columns():
+    query = sql.unnest_columns([[1, 2], ["foo", "bar"]], ("INTEGER", "TEXT"))
+    assert list(query) == ["UNNEST($1::INTEGER[], $2::TEXT[])", [1, 2], ["foo", "bar"]]
+
+    query = sql.unnest([], ("INTEGER", "TEXT"))
+    assert list(query) == ["UNNEST($1::INTEGER[], $2::TEXT[])", [], []]
+
+
+def test_flatten():
+    flat = sql("SELECT * FROM foo WHERE id = {}", 1)
+    assert flat.flatten() is flat
+
+    nested = sql("SELECT * FROM ({}) AS q WHERE {}", flat, sql.all(sql("TRUE")))
+    assert nested.flatten().parts == (
+        "SELECT * FROM (SELECT * FROM foo WHERE id = ",
+        flat.parts[1],
+        ") AS q WHERE (TRUE)",
+    )
+
+    listed = Fragment(["SELECT 1"])
+    assert listed.parts == ("SELECT 1",)
+    assert listed == sql("SELECT 1")
+    assert listed.flatten() is listed
+
+
 def test_unfilled_positional_arg():
     with pytest.raises(ValueError, match="unfilled positional argument"):
         sql("foo {}")
 
 
+def test_format_syntax():
+    assert list(sql("x {0[a:b]}", {"a:b": 1})) == ["x $1", 1]
+    assert list(sql("x {foo:{w}} {foo!r}", foo=1, w=3)) == ["x $1 $1", 1]
+    assert list(sql("{{x}} {}", 1)) == ["{x} $1", 1]
+
+
+@pytest.mark.parametrize("fmt", ["x {a", "x }", "x {", "x {a!}", "x {0[a}"])
+def test_format_syntax_errors(fmt):
+    try:
+        fmt.format(a=1)
+    except ValueError as e:
+        expected = str(e)
+    with pytest.raises(ValueError, match=re.escape(expected)):
+        sql(fmt, a=1)
+
+
 @pytest.mark.parametrize(
     "query",
     [
@@ -190,6 +344,56 @@ def test_slots(query):
     ]
 
 
+def test_compile_template():
+    template = sql.compile_template("SELECT * FROM foo WHERE id = {} AND x = {x}")
+    assert list(template(42, x="bar")) == [
+        "SELECT * FROM foo WHERE id = $1 AND x = $2",
+        42,
+        "bar",
+    ]
+    assert list(template(sql.literal("id"), x=sql.literal("x"))) == [
+        "SELECT * FROM foo WHERE id = id AND x = x"
+    ]
+    assert list(template(1).fill(x=2)) == [
+        "SELECT * FROM foo WHERE id = $1 AND x = $2",
+        1,
+        2,
+    ]
+    with pytest.raises(ValueError, match="unfilled positional argument"):
+        template()
+
+
+class SubFragment(Fragment):
+    pass
+
+
+def test_fragment_subclass_argument():
+    sub = SubFragment(("x = ", sql.value(1)))
+    expected = ["WHERE x = $1", 1]
+    template = sql.compile_template("WHERE {}")
+    # interpreted, generated and explicitly compiled builders
+    assert [list(sql("WHERE {}", sub)) for _ in range(2)] == [expected] * 2
+    assert list(template(sub)) == expected
+
+    assert list(sql.all(sub)) == ["(x = $1)", 1]
+    assert list(sql.list([sub, sub])) == ["x = $1, x = $1", 1]
+    assert list(sql(" AND ").join([sub, sub])) == ["x = $1 AND x = $1", 1]
+    assert list(SubFragment((" AND ", sql.value(2))).join([sub, sub])) == [
+        "x = $1 AND $2x = $1",
+        1,
+        2,
+    ]
+
+
+def test_template_reuse():
+    # the first build is interpreted, later ones use generated code
+    results = [
+        list(sql("SELECT {a}, {}, {a}, {{}} FROM {t}", 1, a=2, t=sql("x")))
+        for _ in range(3)
+    ]
+    assert results == [["SELECT $1, $2, $1, {} FROM x", 2, 1]] * 3
+
+
 def test_slots_same_id_placeholder():
     query = sql("SELECT * FROM foo WHERE start > {id} AND end < {id}")
     assert list(query.fill(id="foo")) == [
@@ -231,6 +435,18 @@ def test_prepare():
         generate_args()
 
 
+def test_compile_query():
+    query = sql("SELECT * FROM foo WHERE start > {start} AND end < {end}", end="end")
+    compiled = query.compile_query()
+    assert compiled(start="start") == (
+        "SELECT * FROM foo WHERE start > $1 AND end < $2",
+        ["start", "end"],
+    )
+    assert compiled(start=1) == query.fill(start=1).query()
+    with pytest.raises(KeyError):
+        compiled()
+
+
 def test_preserve_formatting():
     query = sql("SELECT *   \n    FROM foo")
     assert list(query) == ["SELECT * FROM foo"]
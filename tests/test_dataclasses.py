@@ -150,6 +150,101 @@ def test_upsert():
     ]
 
 
+def test_field_values_sql():
+    @dataclass
+    class Test(ModelBase, table_name="table", primary_key="id"):
+        id: Union[int, None]
+        foo: int
+        bar: str
+
+    t = Test(None, 42, "str")
+
+    assert sql.list(t.field_values_sql()).query() == ("$1, $2, $3", [None, 42, "str"])
+    assert sql.list(t.field_values_sql(default_none=True)).query() == (
+        "DEFAULT, $1, $2",
+        [42, "str"],
+    )
+    assert list(t.insert_sql(exclude=("id",))) == [
+        'INSERT INTO "table" ("foo", "bar") VALUES ($1, $2)',
+        42,
+        "str",
+    ]
+
+
+def test_primary_key():
+    @dataclass
+    class Test(ModelBase, table_name="table", primary_key=("id", "foo")):
+        id: int
+        foo: int
+        bar: str
+
+    @dataclass
+    class Single(ModelBase, table_name="table", primary_key="id"):
+        id: int
+
+    @dataclass
+    class Custom(ModelBase, table_name="table", primary_key="id"):
+        id: int
+
+        def primary_key(self) -> tuple:
+            return ("custom",)
+
+    @dataclass
+    class CustomChild(Custom, table_name="child", primary_key="id"):
+        pass
+
+    assert Test(1, 2, "x").primary_key() == (1, 2)
+    assert Single(1).primary_key() == (1,)
+    assert Custom(1).primary_key() == ("custom",)
+    assert CustomChild(1).primary_key() == ("custom",)
+
+
+def test_model_subclass():
+    @dataclass
+    class Base(ModelBase, table_name="base"):
+        foo: int
+
+    @dataclass
+    class Child(Base, table_name="child"):
+        bar: str = "hi"
+
+    assert Base.from_mapping({"foo": 1}) == Base(1)
+    assert Child.from_mapping({"foo": 1, "bar": "x"}) == Child(1, "x")
+    assert Base.from_mapping({"foo": 2}) == Base(2)
+
+    @dataclass
+    class LateChild(Base, table_name="late_child"):
+        baz: str = "hi"
+
+    assert LateChild.from_mapping({"foo": 1, "baz": "x"}) == LateChild(1, "x")
+    assert LateChild.field_names() == ["foo", "baz"]
+    assert list(LateChild.select_sql()) == [
+        'SELECT "foo", "baz" FROM "late_child" WHERE TRUE'
+    ]
+
+
+def test_multiple_sql():
+    @dataclass
+    class Test(ModelBase, table_name="table", primary_key="id"):
+        id: int
+        foo: str
+
+    rows = [Test(1, "a"), Test(2, "b")]
+
+    assert list(Test.insert_multiple_sql(rows)) == [
+        (
+            'INSERT INTO "table" ("id", "foo")'
+            " SELECT * FROM UNNEST($1::INTEGER[], $2::TEXT[])"
+        ),
+        (1, 2),
+        ("a", "b"),
+    ]
+    assert list(Test.delete_multiple_sql(rows)) == [
+        'DELETE FROM "table" WHERE ("id") IN (SELECT * FROM UNNEST($1::INTEGER[]))',
+        (1, 2),
+    ]
+
+
 def test_serial():
     @dataclass
     class Test(ModelBase, table_name="table", primary_key="id"):
@@ -191,6 +286,11 @@ def test_serde():
         ["FOO", "bar"],
     )
 
+    assert Test("foo", "bar").field_values_sql(exclude=("bar",))[0].query() == (
+        "$1",
+        ["FOO"],
+    )
+
     assert Test.from_mapping({"foo": "FOO", "bar": "BAR"}) == Test("foo", "BAR")
     # make sure the monkey patching didn't screw things up
     assert Test.from_mapping({"foo": "FOO", "bar": "BAR"}) == Test("foo", "BAR")